@@ -1,7 +1,15 @@
-import copy
-from pieces import Pawn
-from utils import position_to_indices
-from game_logic import check_game_status, get_all_legal_moves, move_piece_simulation
+from pieces import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from game_logic import get_all_legal_moves, make_move, unmake_move
+
+# Material value of each piece type, keyed by PIECE_TYPE
+PIECE_VALUES = {
+    PAWN: 10,
+    KNIGHT: 30,
+    BISHOP: 30,
+    ROOK: 50,
+    QUEEN: 90,
+    KING: 900
+}
 
 def evaluate_board(board, color):
     """
@@ -14,32 +22,19 @@ def evaluate_board(board, color):
     Returns:
     - A numerical value representing the board's desirability.
     """
-    piece_values = {
-        'Pawn': 10,
-        'Knight': 30,
-        'Bishop': 30,
-        'Rook': 50,
-        'Queen': 90,
-        'King': 900
-    }
-
     total_value = 0
 
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
+    for row, pieces_in_row in enumerate(board):
+        for piece in pieces_in_row:
             if piece:
-                value = piece_values[type(piece).__name__]
+                value = PIECE_VALUES[piece.PIECE_TYPE]
                 # Add positional bonuses (e.g., center control)
-                position_bonus = 0
-                if isinstance(piece, Pawn):
+                if piece.PIECE_TYPE == PAWN:
                     # Pawns get bonus for advancing
                     if piece.color == 'white':
-                        position_bonus = (6 - row)
+                        value += (6 - row)
                     else:
-                        position_bonus = (row - 1)
-                # Combine piece value and positional bonus
-                value += position_bonus
+                        value += (row - 1)
                 if piece.color == color:
                     total_value += value
                 else:
@@ -65,12 +60,13 @@ def minimax(board, depth, alpha, beta, maximizing_player, current_color, last_mo
     - A tuple (value, move), where 'value' is the evaluation of the board,
       and 'move' is the best move found.
     """
-    # Base case: maximum depth reached or game over
-    game_over, result = check_game_status(board, current_color, last_move)
-    if depth == 0 or game_over:
+    # Base case: maximum depth reached
+    if depth == 0:
         evaluation = evaluate_board(board, 'black')  # Assuming AI plays black
         return evaluation, None
 
+    # The legal moves are generated once and double as the game-over test:
+    # checkmate and stalemate are exactly the positions without any.
     legal_moves = get_all_legal_moves(board, current_color, last_move)
 
     if not legal_moves:
@@ -83,16 +79,12 @@ def minimax(board, depth, alpha, beta, maximizing_player, current_color, last_mo
         best_move = None
         for move in legal_moves:
             start_pos, end_pos = move
-            # Make a deep copy of the board to simulate the move
-            new_board = copy.deepcopy(board)
-            # Get the piece from the new board
-            start_row, start_col = position_to_indices(start_pos)
-            piece = new_board[start_row][start_col]
-            # Simulate the move
-            move_piece_simulation(new_board, piece, start_pos, end_pos, last_move)
+            # Play the move on the board itself and take it back after searching it
+            undo = make_move(board, start_pos, end_pos)
             new_last_move = (start_pos, end_pos)
             # Recursive call, switch player and color
-            evaluation, _ = minimax(new_board, depth - 1, alpha, beta, False, 'white', new_last_move)
+            evaluation, _ = minimax(board, depth - 1, alpha, beta, False, 'white', new_last_move)
+            unmake_move(board, undo)
             if evaluation > max_eval:
                 max_eval = evaluation
                 best_move = move
@@ -105,12 +97,10 @@ def minimax(board, depth, alpha, beta, maximizing_player, current_color, last_mo
         best_move = None
         for move in legal_moves:
             start_pos, end_pos = move
-            new_board = copy.deepcopy(board)
-            start_row, start_col = position_to_indices(start_pos)
-            piece = new_board[start_row][start_col]
-            move_piece_simulation(new_board, piece, start_pos, end_pos, last_move)
+            undo = make_move(board, start_pos, end_pos)
             new_last_move = (start_pos, end_pos)
-            evaluation, _ = minimax(new_board, depth - 1, alpha, beta, True, 'black', new_last_move)
+            evaluation, _ = minimax(board, depth - 1, alpha, beta, True, 'black', new_last_move)
+            unmake_move(board, undo)
             if evaluation < min_eval:
                 min_eval = evaluation
                 best_move = move
@@ -1,6 +1,164 @@
-import copy
-from pieces import Pawn, King, Queen
-from utils import get_piece_info, position_to_indices, indices_to_position
+import random
+
+from pieces import (Queen, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
+                    KNIGHT_MOVES, KING_MOVES, PAWN_MOVES, ORTHOGONAL_BETWEEN, DIAGONAL_BETWEEN)
+from utils import POS_IDX, position_to_indices, indices_to_position
+
+# Every square on the board as (row, col, position), built once so move
+# generation does not rebuild the same position strings for every piece.
+ALL_SQUARES = [(row, col, indices_to_position(row, col)) for row in range(8) for col in range(8)]
+
+def _ordered_targets(reachable_squares):
+    """
+    Lists the squares a piece can reach from each square as ALL_SQUARES entries.
+
+    Parameters:
+    - reachable_squares: A dict mapping each (row, col) to the set of (row, col) squares reachable from it.
+
+    Returns:
+    - A dict mapping each (row, col) to a tuple of (row, col, position) entries, in board order.
+    """
+    return {square: tuple(target for target in ALL_SQUARES if target[:2] in reachable)
+            for square, reachable in reachable_squares.items()}
+
+def _line_squares(between):
+    """
+    Lists the squares sharing a line with each square of the board.
+
+    Parameters:
+    - between: ORTHOGONAL_BETWEEN or DIAGONAL_BETWEEN from pieces.
+
+    Returns:
+    - A dict mapping each (row, col) to the set of (row, col) squares on one of its lines.
+    """
+    lines = {(row, col): set() for row in range(8) for col in range(8)}
+    for start, end in between:
+        lines[start].add(end)
+    return lines
+
+# The only destinations worth probing for each piece on each square: anything
+# else has the wrong shape and would just be rejected by valid_moves
+KNIGHT_TARGETS = _ordered_targets(KNIGHT_MOVES)
+KING_TARGETS = _ordered_targets(KING_MOVES)
+PAWN_TARGETS = {direction: _ordered_targets(moves) for direction, moves in PAWN_MOVES.items()}
+ORTHOGONAL_LINES = _line_squares(ORTHOGONAL_BETWEEN)
+DIAGONAL_LINES = _line_squares(DIAGONAL_BETWEEN)
+ROOK_TARGETS = _ordered_targets(ORTHOGONAL_LINES)
+BISHOP_TARGETS = _ordered_targets(DIAGONAL_LINES)
+QUEEN_TARGETS = _ordered_targets({square: ORTHOGONAL_LINES[square] | DIAGONAL_LINES[square]
+                                  for square in ORTHOGONAL_LINES})
+TARGETS_BY_TYPE = {KNIGHT: KNIGHT_TARGETS, BISHOP: BISHOP_TARGETS, ROOK: ROOK_TARGETS,
+                   QUEEN: QUEEN_TARGETS, KING: KING_TARGETS}
+
+# Directions a sliding piece travels in, as (row_step, col_step).
+ORTHOGONAL_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+def _build_rays(directions):
+    """
+    Lists the squares a sliding piece passes over from every square of the board.
+
+    Parameters:
+    - directions: The (row_step, col_step) directions the piece travels in.
+
+    Returns:
+    - A table indexed [row][col] holding one tuple of (row, col) squares per
+      direction, ordered outwards from the square up to the edge of the board.
+    """
+    rays = [[None] * 8 for _ in range(8)]
+    for row in range(8):
+        for col in range(8):
+            square_rays = []
+            for row_step, col_step in directions:
+                ray = []
+                ray_row, ray_col = row + row_step, col + col_step
+                while 0 <= ray_row < 8 and 0 <= ray_col < 8:
+                    ray.append((ray_row, ray_col))
+                    ray_row += row_step
+                    ray_col += col_step
+                if ray:
+                    square_rays.append(tuple(ray))
+            rays[row][col] = tuple(square_rays)
+    return rays
+
+ORTHOGONAL_RAYS = _build_rays(ORTHOGONAL_DIRECTIONS)
+DIAGONAL_RAYS = _build_rays(DIAGONAL_DIRECTIONS)
+
+# Zobrist keys: one random 64-bit number per (piece type, color, square), plus
+# keys for the side to move and for the file of a pawn that can be taken en
+# passant. XOR-ing the keys of everything in a position gives its hash.
+_zobrist_random = random.Random(2024)
+ZOBRIST_PIECE_KEYS = [[[[_zobrist_random.getrandbits(64) for col in range(8)] for row in range(8)]
+                       for color_id in range(2)] for piece_type in range(KING + 1)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+ZOBRIST_EN_PASSANT = [_zobrist_random.getrandbits(64) for col in range(8)]
+
+# Legal moves already generated, keyed by position hash. Cleared once it holds
+# LEGAL_MOVE_CACHE_SIZE positions so a long search cannot use unbounded memory.
+LEGAL_MOVE_CACHE = {}
+LEGAL_MOVE_CACHE_SIZE = 200000
+
+def find_king(board, color):
+    """
+    Finds the king of the given color.
+
+    Parameters:
+    - board: The current state of the chessboard.
+    - color: 'white' or 'black'.
+
+    Returns:
+    - A tuple (row, col) of the king's square, or None if it is not on the board.
+    """
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece and piece.PIECE_TYPE == KING and piece.color == color:
+                return row, col
+    return None
+
+def is_square_attacked(board, row, col, by_color):
+    """
+    Determines if any piece of the given color attacks a square.
+
+    Works outwards from the square: it looks for pawns, knights and kings on
+    the few squares they could attack from, then follows each rank, file and
+    diagonal to the first piece in the way.
+
+    Parameters:
+    - board: The current state of the chessboard.
+    - row, col: Indices of the square to test.
+    - by_color: The color of the attacking side ('white' or 'black').
+
+    Returns:
+    - True if the square is attacked, False otherwise.
+    """
+    # Pawns capture diagonally forwards, so look one row behind the square from the attacker's side
+    pawn_row = row + 1 if by_color == 'white' else row - 1
+    if 0 <= pawn_row < 8:
+        for pawn_col in (col - 1, col + 1):
+            if 0 <= pawn_col < 8:
+                piece = board[pawn_row][pawn_col]
+                if piece and piece.PIECE_TYPE == PAWN and piece.color == by_color:
+                    return True
+
+    # Knight and king moves are symmetric: the squares they attack from are the squares they reach
+    for leaper_moves, leaper in ((KNIGHT_MOVES, KNIGHT), (KING_MOVES, KING)):
+        for attacker_row, attacker_col in leaper_moves[(row, col)]:
+            piece = board[attacker_row][attacker_col]
+            if piece and piece.PIECE_TYPE == leaper and piece.color == by_color:
+                return True
+
+    for rays, sliders in ((ORTHOGONAL_RAYS[row][col], (ROOK, QUEEN)),
+                          (DIAGONAL_RAYS[row][col], (BISHOP, QUEEN))):
+        for ray in rays:
+            for attacker_row, attacker_col in ray:
+                piece = board[attacker_row][attacker_col]
+                if piece:
+                    if piece.color == by_color and piece.PIECE_TYPE in sliders:
+                        return True
+                    break
+
+    return False
 
 def is_in_check(board, color, last_move):
     """
@@ -10,51 +168,125 @@ def is_in_check(board, color, last_move):
     - board: The current state of the chessboard.
     - color: 'white' or 'black'.
     - last_move: A tuple (last_start_pos, last_end_pos) representing the opponent's last move.
+      En passant can never capture a king, so it does not affect the result.
 
     Returns:
     - True if the king is in check, False otherwise.
     """
     # Find the king's position
+    king_square = find_king(board, color)
 
-    king_position = None
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and isinstance(piece, King) and piece.color == color:
-                king_position = indices_to_position(col, row)
-                break
-        if king_position:
-            break
-
-    if not king_position:
+    if king_square is None:
         # The king is not on the board (should not happen in a normal game)
         return True
 
     # Get opponent's color
     opponent_color = 'black' if color == 'white' else 'white'
 
-    # Check if any opponent piece can move to the king's position
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece.color == opponent_color:
-                start_pos = indices_to_position(col, row)
-                if isinstance(piece, Pawn):
-                    is_valid = piece.valid_moves(board, start_pos, king_position, last_move)
-                else:
-                    is_valid = piece.valid_moves(board, start_pos, king_position)
-                if is_valid:
-                    return True  # King is in check
+    king_row, king_col = king_square
+    return is_square_attacked(board, king_row, king_col, opponent_color)
 
-    return False  # King is not in check
 
+def get_pinned_squares(board, color):
+    """
+    Finds the pieces of the given color that are pinned to their own king.
 
-import copy
+    A piece is pinned when it is the only piece standing between its king and
+    an opponent rook, bishop or queen on the same line. Moving any other piece
+    (apart from the king itself) can never expose the king to check.
+
+    Parameters:
+    - board: The current state of the chessboard.
+    - color: 'white' or 'black'.
+
+    Returns:
+    - A set of (row, col) tuples for the squares holding pinned pieces.
+    """
+    pinned = set()
+    king_square = find_king(board, color)
+    if king_square is None:
+        return pinned
+
+    king_row, king_col = king_square
+    for rays, sliders in ((ORTHOGONAL_RAYS[king_row][king_col], (ROOK, QUEEN)),
+                          (DIAGONAL_RAYS[king_row][king_col], (BISHOP, QUEEN))):
+        for ray in rays:
+            blocker = None
+            for row, col in ray:
+                piece = board[row][col]
+                if piece:
+                    if blocker is not None:
+                        # Second piece on the line: the blocker is pinned if it's an enemy slider
+                        if piece.color != color and piece.PIECE_TYPE in sliders:
+                            pinned.add(blocker)
+                        break
+                    if piece.color != color:
+                        # An enemy piece shields the king along this line
+                        break
+                    blocker = (row, col)
+
+    return pinned
+
+def position_hash(board, color, last_move):
+    """
+    Computes the Zobrist hash of a position.
+
+    Parameters:
+    - board: The current state of the chessboard.
+    - color: The color of the player to move ('white' or 'black').
+    - last_move: A tuple (last_start_pos, last_end_pos) representing the opponent's last move.
+
+    Returns:
+    - A 64-bit integer identifying the pieces on the board, the side to move
+      and the file of any pawn that can be captured en passant.
+    """
+    key = ZOBRIST_BLACK_TO_MOVE if color == 'black' else 0
+    for row, board_row in enumerate(board):
+        for col, piece in enumerate(board_row):
+            if piece:
+                key ^= ZOBRIST_PIECE_KEYS[piece.PIECE_TYPE][piece.color_id][row][col]
+
+    if last_move:
+        last_start_row, _ = position_to_indices(last_move[0])
+        last_end_row, last_end_col = position_to_indices(last_move[1])
+        last_moved_piece = board[last_end_row][last_end_col]
+        # Only a pawn that has just advanced two squares can be captured en passant
+        if (abs(last_end_row - last_start_row) == 2 and last_moved_piece is not None
+                and last_moved_piece.PIECE_TYPE == PAWN and last_moved_piece.color != color):
+            key ^= ZOBRIST_EN_PASSANT[last_end_col]
+
+    return key
 
 def get_all_legal_moves(board, color, last_move):
     """
     Generates all legal moves for the player of the given color.
 
+    Positions that were seen before are answered from LEGAL_MOVE_CACHE, so a
+    search that reaches the same position by different move orders only
+    generates its moves once.
+
+    Parameters:
+    - board: The current state of the chessboard.
+    - color: 'white' or 'black'.
+    - last_move: A tuple (last_start_pos, last_end_pos) representing the opponent's last move.
+
+    Returns:
+    - A list of tuples (start_pos, end_pos) representing legal moves.
+    """
+    key = position_hash(board, color, last_move)
+    legal_moves = LEGAL_MOVE_CACHE.get(key)
+    if legal_moves is None:
+        legal_moves = _generate_legal_moves(board, color, last_move)
+        if len(LEGAL_MOVE_CACHE) >= LEGAL_MOVE_CACHE_SIZE:
+            LEGAL_MOVE_CACHE.clear()
+        LEGAL_MOVE_CACHE[key] = legal_moves
+    # Hand out a copy so callers cannot change the cached list
+    return list(legal_moves)
+
+def _generate_legal_moves(board, color, last_move):
+    """
+    Generates all legal moves for the player of the given color, without using the cache.
+
     Parameters:
     - board: The current state of the chessboard.
     - color: 'white' or 'black'.
@@ -65,32 +297,42 @@ def get_all_legal_moves(board, color, last_move):
     """
     legal_moves = []
 
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece.color == color:
-                start_pos = indices_to_position(col, row)  # Ensure correct order
-                # Generate all possible end positions for the piece
-                for end_row in range(8):
-                    for end_col in range(8):
-                        end_pos = indices_to_position(end_col, end_row)  # Ensure correct order
-                        # Check if the move is valid
-                        if isinstance(piece, Pawn):
-                            is_valid = piece.valid_moves(board, start_pos, end_pos, last_move)
-                        else:
-                            is_valid = piece.valid_moves(board, start_pos, end_pos)
-                        if is_valid:
-                            # Make a deep copy of the board to test the move
-                            board_copy = copy.deepcopy(board)
-                            # Get the piece on the copied board
-                            piece_copy = board_copy[row][col]
-                            # Simulate the move on the copied board
-                            move_piece_simulation(board_copy, piece_copy, start_pos, end_pos, last_move)
-                            # Update the last move for the simulation
-                            simulated_last_move = (start_pos, end_pos)
-                            # Check if the king would be in check after the move
-                            if not is_in_check(board_copy, color, simulated_last_move):
-                                legal_moves.append((start_pos, end_pos))
+    # While the king is not in check, only king moves, moves of pinned pieces
+    # and en passant captures can expose it, so every other valid move is legal
+    # without simulating it.
+    if is_in_check(board, color, last_move):
+        pinned_squares = None
+    else:
+        pinned_squares = get_pinned_squares(board, color)
+
+    for row, col, start_pos in ALL_SQUARES:
+        piece = board[row][col]
+        if piece and piece.color == color:
+            needs_check_test = (pinned_squares is None or piece.PIECE_TYPE == KING
+                                or (row, col) in pinned_squares)
+            # Only probe the squares the piece could reach on an empty board
+            if piece.PIECE_TYPE == PAWN:
+                targets = PAWN_TARGETS[piece.direction][(row, col)]
+            else:
+                targets = TARGETS_BY_TYPE[piece.PIECE_TYPE][(row, col)]
+            # Generate all possible end positions for the piece
+            for end_row, end_col, end_pos in targets:
+                # Check if the move is valid
+                if piece.valid_moves(board, start_pos, end_pos, last_move):
+                    is_en_passant = (piece.PIECE_TYPE == PAWN and end_col != col
+                                     and board[end_row][end_col] is None)
+                    if not needs_check_test and not is_en_passant:
+                        legal_moves.append((start_pos, end_pos))
+                        continue
+                    # Play the move on the board itself and take it back after the test
+                    undo = make_move(board, start_pos, end_pos)
+                    # Update the last move for the simulation
+                    simulated_last_move = (start_pos, end_pos)
+                    # Check if the king would be in check after the move
+                    in_check = is_in_check(board, color, simulated_last_move)
+                    unmake_move(board, undo)
+                    if not in_check:
+                        legal_moves.append((start_pos, end_pos))
 
     return legal_moves
 
@@ -132,7 +374,7 @@ def check_game_status(board, color, last_move):
     return False, None
 
 
-def move_piece(board, start_pos, end_pos, last_move):
+def move_piece(board, start_pos, end_pos, last_move, promotion=None):
     """
     Moves a piece from start_pos to end_pos if the move is valid.
 
@@ -140,26 +382,23 @@ def move_piece(board, start_pos, end_pos, last_move):
     - board: The current state of the chessboard.
     - start_pos: Starting position string (e.g., 'e2').
     - end_pos: Ending position string (e.g., 'e4').
+    - promotion: Piece letter ('Q', 'R', 'B', 'N') for a promoting pawn; the player is asked if None.
 
     Returns:
     - True if the move was successful, False otherwise.
     """
 
-    # Get the piece at start_pos
-    piece_type, color = get_piece_info(board, start_pos)
-    if piece_type is None:
+    # Get the piece at start_pos, reading the board only once
+    start = POS_IDX.get(start_pos)
+    piece = board[start[0]][start[1]] if start is not None else None
+    if piece is None:
         print(f"No piece at starting position {start_pos}")
         return False
-
-    # Get the piece object from the board
-    start_row, start_col = position_to_indices(start_pos)
-    piece = board[start_row][start_col]
+    start_row, start_col = start
+    piece_type, color = type(piece).__name__, piece.color
 
     # Check if the move is valid according to the piece's valid_moves function
-    if isinstance(piece, Pawn):
-        is_valid = piece.valid_moves(board, start_pos, end_pos, last_move)
-    else:
-        is_valid = piece.valid_moves(board, start_pos, end_pos)
+    is_valid = piece.valid_moves(board, start_pos, end_pos, last_move)
 
     # Check if the move is valid according to the piece's valid_moves function
     if is_valid:
@@ -168,17 +407,18 @@ def move_piece(board, start_pos, end_pos, last_move):
         target_piece = board[end_row][end_col]
 
         # Handle en passant capture for pawn
-        if isinstance(piece, Pawn):
+        if piece.PIECE_TYPE == PAWN:
             # En passant capture
             if abs(end_col - start_col) == 1 and board[end_row][end_col] is None:
                 # The pawn moves diagonally to an empty square, possible en passant
                 captured_row = start_row  # The pawn being captured is on the starting row
                 captured_col = end_col
                 captured_pawn = board[captured_row][captured_col]
-                if isinstance(captured_pawn, Pawn) and captured_pawn.color != piece.color:
+                if (captured_pawn is not None and captured_pawn.PIECE_TYPE == PAWN
+                        and captured_pawn.color != piece.color):
                     # Remove the captured pawn
                     board[captured_row][captured_col] = None
-                    print(f"{piece.color.capitalize()} Pawn captures en passant at {indices_to_position(captured_col, captured_row)}")
+                    print(f"{piece.color.capitalize()} Pawn captures en passant at {indices_to_position(captured_row, captured_col)}")
 
         # Capture logic (if there's an opponent's piece at the destination)
         if target_piece and target_piece.color != piece.color:
@@ -193,11 +433,11 @@ def move_piece(board, start_pos, end_pos, last_move):
         piece.set_position(end_pos)
 
         # Handle pawn promotion
-        if isinstance(piece, Pawn):
+        if piece.PIECE_TYPE == PAWN:
             promotion_row = 0 if piece.color == 'white' else 7
             if end_row == promotion_row:
                 # Pawn reaches the last rank, promotion occurs
-                promoted_piece = piece.promote_pawn(piece.color, end_pos)
+                promoted_piece = piece.promote_pawn(piece.color, end_pos, promotion)
                 board[end_row][end_col] = promoted_piece
                 print(f"{piece.color.capitalize()} Pawn promoted to {type(promoted_piece).__name__} at {end_pos}")
             else:
@@ -205,8 +445,8 @@ def move_piece(board, start_pos, end_pos, last_move):
                 piece.has_moved = True
 
         else:
-            # If the piece has a 'has_moved' attribute (e.g., rook, king), set it to True
-            if hasattr(piece, 'has_moved'):
+            # If the piece tracks whether it has moved (e.g., rook), set it to True
+            if piece.HAS_MOVED_TRACKED:
                 piece.has_moved = True
 
         print(f"{color} {piece_type} moved from {start_pos} to {end_pos}")
@@ -233,7 +473,7 @@ def move_piece_simulation(board, piece, start_pos, end_pos, last_move):
     end_row, end_col = position_to_indices(end_pos)
 
     # Handle en passant capture
-    if isinstance(piece, Pawn):
+    if piece.PIECE_TYPE == PAWN:
         if abs(end_col - start_col) == 1 and board[end_row][end_col] is None:
             # En passant capture
             captured_row = start_row
@@ -246,7 +486,7 @@ def move_piece_simulation(board, piece, start_pos, end_pos, last_move):
     piece.position = end_pos
 
     # Handle pawn promotion
-    if isinstance(piece, Pawn):
+    if piece.PIECE_TYPE == PAWN:
         promotion_row = 0 if piece.color == 'white' else 7
         if end_row == promotion_row:
             # Promote to Queen by default in simulation
@@ -254,5 +494,55 @@ def move_piece_simulation(board, piece, start_pos, end_pos, last_move):
             board[end_row][end_col] = promoted_piece
         else:
             piece.has_moved = True
-    elif hasattr(piece, 'has_moved'):
+    elif piece.HAS_MOVED_TRACKED:
         piece.has_moved = True
+
+def make_move(board, start_pos, end_pos):
+    """
+    Plays a move directly on the board, including en passant and pawn promotion,
+    so that it can be taken back with unmake_move instead of copying the board.
+
+    Parameters:
+    - board: The current state of the chessboard.
+    - start_pos: The starting position of the piece.
+    - end_pos: The ending position of the piece.
+
+    Returns:
+    - An undo record to pass to unmake_move.
+    """
+    start_row, start_col = position_to_indices(start_pos)
+    end_row, end_col = position_to_indices(end_pos)
+    piece = board[start_row][start_col]
+
+    # The captured piece sits beside the pawn for en passant, otherwise on the end square
+    captured_row, captured_col = end_row, end_col
+    if piece.PIECE_TYPE == PAWN and abs(end_col - start_col) == 1 and board[end_row][end_col] is None:
+        captured_row = start_row
+    captured_piece = board[captured_row][captured_col]
+
+    undo = (piece, start_pos, end_pos, captured_piece, captured_row, captured_col,
+            piece.has_moved if piece.HAS_MOVED_TRACKED else None)
+    move_piece_simulation(board, piece, start_pos, end_pos, None)
+    return undo
+
+def unmake_move(board, undo):
+    """
+    Takes back a move played with make_move, restoring any captured or promoted piece.
+
+    Parameters:
+    - board: The chessboard the move was played on.
+    - undo: The undo record returned by make_move.
+
+    Returns:
+    - None
+    """
+    piece, start_pos, end_pos, captured_piece, captured_row, captured_col, has_moved = undo
+    start_row, start_col = position_to_indices(start_pos)
+    end_row, end_col = position_to_indices(end_pos)
+
+    board[end_row][end_col] = None
+    board[captured_row][captured_col] = captured_piece
+    board[start_row][start_col] = piece
+    piece.position = start_pos
+    if has_moved is not None:
+        piece.has_moved = has_moved
@@ -1,16 +1,104 @@
-from utils import get_piece_info
+from utils import POS_IDX, get_piece_info
 from game_logic import move_piece
 from board import initialize_board, print_board
 from game_logic import check_game_status
 from algorithm import minimax
 
-def main():
-    board = initialize_board()
-    print("Welcome to the Chess Game!")
-    print_board(board)
-    
-    human_color = 'white'  # Human plays white
-    ai_color = 'black'     # AI plays black
+AI_DEPTH = 3  # Search depth of the minimax AI
+
+def human_player(board, color, last_move):
+    """
+    Asks the player at the keyboard for a move.
+
+    Parameters:
+    - board: The current state of the chessboard.
+    - color: The color of the player to move ('white' or 'black').
+    - last_move: A tuple (last_start_pos, last_end_pos) representing the last move made.
+
+    Returns:
+    - A tuple (start_pos, end_pos), or None if the player quits.
+    """
+    while True:
+        move_input = input("Enter your move (e.g., e2 e4) or 'exit' to quit: ").strip()
+        if move_input.lower() == 'exit':
+            print("Thank you for playing!")
+            return None
+        try:
+            start_pos, end_pos = move_input.lower().split()
+        except ValueError:
+            print("Invalid input format. Please enter moves in the format 'e2 e4'.")
+            continue
+        # Reject squares off the board here, so the move code only ever sees valid positions
+        if start_pos not in POS_IDX or end_pos not in POS_IDX:
+            print("Invalid position. Squares run from a1 to h8.")
+            continue
+        # Get the piece at the starting position
+        piece_type, piece_color = get_piece_info(board, start_pos)
+        if piece_color != color:
+            print(f"It's {color}'s turn. Please move your own pieces.")
+            continue
+        return start_pos, end_pos
+
+def ai_player(board, color, last_move):
+    """
+    Chooses a move with the minimax search.
+
+    Parameters:
+    - board: The current state of the chessboard.
+    - color: The color of the player to move ('white' or 'black').
+    - last_move: A tuple (last_start_pos, last_end_pos) representing the last move made.
+
+    Returns:
+    - A tuple (start_pos, end_pos, promotion), or None if there is no legal move.
+    """
+    print("AI is thinking...")
+    # The search scores positions for black, so black maximizes and white minimizes
+    evaluation, ai_move = minimax(board, depth=AI_DEPTH, alpha=float('-inf'), beta=float('inf'),
+                                  maximizing_player=(color == 'black'), current_color=color,
+                                  last_move=last_move)
+    if ai_move is None:
+        print("AI has no valid moves. Game over.")
+        return None
+    start_pos, end_pos = ai_move
+    # The search only considers queen promotions
+    return start_pos, end_pos, 'Q'
+
+def play_move(board, turn, move, last_move):
+    """
+    Plays one move for the side to move.
+
+    Parameters:
+    - board: The current state of the chessboard.
+    - turn: The color of the player to move ('white' or 'black').
+    - move: A tuple (start_pos, end_pos), optionally followed by a promotion letter.
+    - last_move: A tuple (last_start_pos, last_end_pos) representing the last move made.
+
+    Returns:
+    - A tuple (turn, last_move, moved) with the side to move next, the updated
+      last move and whether the move was played.
+    """
+    start_pos, end_pos = move[0], move[1]
+    promotion = move[2] if len(move) > 2 else None
+    if not move_piece(board, start_pos, end_pos, last_move, promotion):
+        return turn, last_move, False
+    next_turn = 'black' if turn == 'white' else 'white'
+    return next_turn, (start_pos, end_pos), True
+
+def play_game(white_player, black_player, board=None):
+    """
+    Plays a game between two players, e.g. a human against the AI or the AI against itself.
+
+    Parameters:
+    - white_player, black_player: Functions taking (board, color, last_move) and
+      returning a move for play_move, or None to stop the game.
+    - board: The position to start from; a new game if None.
+
+    Returns:
+    - 'white_win', 'black_win', 'draw', or None if a player stopped the game.
+    """
+    if board is None:
+        board = initialize_board()
+    players = {'white': white_player, 'black': black_player}
     turn = 'white'         # White starts first
     last_move = None  # Keep track of the last move
 
@@ -18,51 +106,30 @@ def main():
         print(f"\n{turn.capitalize()}'s turn")
         # Check if the game is over before the player's move
         game_over, result = check_game_status(board, turn, last_move=last_move)
-
         if game_over:
-            break
-
-        if turn == human_color:
-            move_input = input("Enter your move (e.g., e2 e4) or 'exit' to quit: ").strip()
-            if move_input.lower() == 'exit':
-                print("Thank you for playing!")
-                break
-            try:
-                start_pos, end_pos = move_input.split()
-                # Get the piece at the starting position
-                piece_type, color = get_piece_info(board, start_pos)
-                if color != turn:
-                    print(f"It's {turn}'s turn. Please move your own pieces.")
-                    continue
-                # Attempt to move the piece
-                if move_piece(board, start_pos, end_pos, last_move):
-                    # Update the last move
-                    last_move = (start_pos, end_pos)
-                    print_board(board)
-                    # Switch turns
-                    turn = ai_color
-                else:
-                    print("Move was not successful. Try again.")
-            except ValueError:
-                print("Invalid input format. Please enter moves in the format 'e2 e4'.")
-            except Exception as e:
-                print(f"An error occurred: {e}")
-                continue
+            return result
+
+        move = players[turn](board, turn, last_move)
+        if move is None:
+            return None
+
+        try:
+            turn, last_move, moved = play_move(board, turn, move, last_move)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            continue
+        if moved:
+            print_board(board)
         else:
-            # AI's turn
-            print("AI is thinking...")
-            evaluation, ai_move = minimax(board, depth=3, alpha=float('-inf'), beta=float('inf'),
-                                          maximizing_player=True, current_color=ai_color, last_move=last_move)
-            if ai_move:
-                start_pos, end_pos = ai_move
-                move_piece(board, start_pos, end_pos, last_move)
-                print(f"AI moved from {start_pos} to {end_pos}")
-                print_board(board)
-                # Switch turns
-                turn = human_color
-            else:
-                print("AI has no valid moves. Game over.")
-                break
+            print("Move was not successful. Try again.")
+
+def main():
+    board = initialize_board()
+    print("Welcome to the Chess Game!")
+    print_board(board)
+
+    # Human plays white, AI plays black
+    result = play_game(human_player, ai_player, board)
 
     # After game over, display the result
     if result == 'white_win':
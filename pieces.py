@@ -1,8 +1,83 @@
-from utils import position_to_indices
+from utils import POS_IDX
+
+# Integer tag for each piece type; comparing PIECE_TYPE is cheaper than isinstance
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+
+# Board symbol for each piece type, indexed as SYMBOLS[PIECE_TYPE][color_id]
+SYMBOLS = (
+    ('', ''),
+    ('\u2659', '\u265F'),  # Pawn
+    ('\u2658', '\u265E'),  # Knight
+    ('\u2657', '\u265D'),  # Bishop
+    ('\u2656', '\u265C'),  # Rook
+    ('\u2655', '\u265B'),  # Queen
+    ('\u2654', '\u265A'),  # King
+)
+
+# Steps a knight or king can take, as (row_offset, col_offset)
+KNIGHT_DELTAS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_DELTAS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+def _leaper_moves(deltas):
+    """
+    Builds the squares a piece taking fixed steps (knight, king, pawn) can reach
+    from every square of the board.
+
+    Parameters:
+    - deltas: The (row_offset, col_offset) steps the piece can take.
+
+    Returns:
+    - A dict mapping each (row, col) to a frozenset of the (row, col) squares reachable from it.
+    """
+    return {(row, col): frozenset((row + row_offset, col + col_offset)
+                                  for row_offset, col_offset in deltas
+                                  if 0 <= row + row_offset < 8 and 0 <= col + col_offset < 8)
+            for row in range(8) for col in range(8)}
+
+KNIGHT_MOVES = _leaper_moves(KNIGHT_DELTAS)
+KING_MOVES = _leaper_moves(KING_DELTAS)
+# Pawn pushes (one or two squares) and diagonal captures, keyed by the pawn's direction
+PAWN_MOVES = {direction: _leaper_moves(((direction, 0), (2 * direction, 0), (direction, -1), (direction, 1)))
+              for direction in (-1, 1)}
+
+def _between_squares(directions):
+    """
+    Builds the squares a sliding piece passes over between any two squares on a shared line.
+
+    Parameters:
+    - directions: The (row_step, col_step) directions the piece travels in.
+
+    Returns:
+    - A dict mapping ((start_row, start_col), (end_row, end_col)) to a tuple of the
+      (row, col) squares strictly between them. Pairs not on a shared line are absent.
+    """
+    between = {}
+    for row in range(8):
+        for col in range(8):
+            for row_step, col_step in directions:
+                path = []
+                end_row, end_col = row + row_step, col + col_step
+                while 0 <= end_row < 8 and 0 <= end_col < 8:
+                    between[(row, col), (end_row, end_col)] = tuple(path)
+                    path.append((end_row, end_col))
+                    end_row += row_step
+                    end_col += col_step
+    return between
+
+# Squares between two squares on the same row or column, and on the same diagonal
+ORTHOGONAL_BETWEEN = _between_squares(((1, 0), (-1, 0), (0, 1), (0, -1)))
+DIAGONAL_BETWEEN = _between_squares(((1, 1), (1, -1), (-1, 1), (-1, -1)))
 
 class Piece:
+    # Slots instead of a per-instance __dict__: pieces are copied and read constantly during search
+    __slots__ = ('color', 'color_id', 'position')
+    PIECE_TYPE = 0
+    # True for pieces that keep a has_moved flag (rooks and pawns)
+    HAS_MOVED_TRACKED = False
+
     def __init__(self, color, position):
         self.color = color  # 'white' or 'black'
+        self.color_id = 0 if color == 'white' else 1
         self.position = position
         
     def set_position(self, position):
@@ -22,17 +97,16 @@ class Piece:
         return file in 'abcdefgh' and rank in '12345678'
 
     def __str__(self):
-        # To be overridden in subclasses
-        pass
+        return SYMBOLS[self.PIECE_TYPE][self.color_id]
 
 class King(Piece):
+    __slots__ = ()
+    PIECE_TYPE = KING
+
     def __init__(self, color, position):
         super().__init__(color, position)
 
-    def __str__(self):
-        return '\u2654' if self.color == 'white' else '\u265A'
-    
-    def valid_moves(self, board, start_pos, end_pos):
+    def valid_moves(self, board, start_pos, end_pos, last_move=None):
         """
         Determines if moving the king from start_pos to end_pos is valid.
 
@@ -40,39 +114,35 @@ class King(Piece):
         - board: The current state of the chessboard.
         - start_pos: Starting position string (e.g., 'e1').
         - end_pos: Ending position string (e.g., 'e2').
+        - last_move: Unused; accepted so every piece shares the same signature.
 
         Returns:
         - True if the move is valid, False otherwise.
         """
-        # Convert positions to indices
-        try:
-            start_row, start_col = position_to_indices(start_pos)
-            end_row, end_col = position_to_indices(end_pos)
-        except ValueError as e:
-            print(e)
+        # Convert positions to indices; a position off the board is never a valid move
+        start = POS_IDX.get(start_pos)
+        end = POS_IDX.get(end_pos)
+        if start is None or end is None:
             return False
-        
-        # Calculate movement differences
-        col_diff = abs(end_col - start_col)
-        row_diff = abs(end_row - start_row)
 
-        if max(col_diff, row_diff) == 1:
-            # King moves one square in any direction
-            target_piece = board[end_row][end_col]
-            if target_piece is None or target_piece.color != self.color:
-                return True
-        # Castling logic can be added here if desired
-        return False
+        if end not in KING_MOVES[start]:
+            # Castling logic can be added here if desired
+            return False
+
+        # King moves one square in any direction
+        end_row, end_col = end
+        target_piece = board[end_row][end_col]
+        return target_piece is None or target_piece.color != self.color
 
     
 class Queen(Piece):
+    __slots__ = ()
+    PIECE_TYPE = QUEEN
+
     def __init__(self, color, position):
         super().__init__(color, position)
     
-    def __str__(self):
-        return '\u2655' if self.color == 'white' else '\u265B'
-    
-    def valid_moves(self, board, start_pos, end_pos):
+    def valid_moves(self, board, start_pos, end_pos, last_move=None):
         """
         Determines if moving the queen from start_pos to end_pos is valid.
 
@@ -80,76 +150,45 @@ class Queen(Piece):
         - board: The current state of the chessboard.
         - start_pos: Starting position string (e.g., 'd1').
         - end_pos: Ending position string (e.g., 'h5').
+        - last_move: Unused; accepted so every piece shares the same signature.
 
         Returns:
         - True if the move is valid, False otherwise.
         """
-        # Convert positions to indices
-        try:
-            start_row, start_col = position_to_indices(start_pos)
-            end_row, end_col = position_to_indices(end_pos)
-        except ValueError as e:
-            print(e)
+        # Convert positions to indices; a position off the board is never a valid move
+        start = POS_IDX.get(start_pos)
+        end = POS_IDX.get(end_pos)
+        if start is None or end is None:
             return False
-        
-        col_diff = end_col - start_col
-        row_diff = end_row - start_row
 
-        if start_row == end_row or start_col == end_col:
-            # Rook-like movement (along row or column)
-            # Determine the direction of movement
-            col_step = 0
-            if start_col < end_col:
-                col_step = 1
-            elif start_col > end_col:
-                col_step = -1
-
-            row_step = 0
-            if start_row < end_row:
-                row_step = 1
-            elif start_row > end_row:
-                row_step = -1
-
-            # Check all squares between start and end for obstructions
-            col, row = start_col + col_step, start_row + row_step
-            while (col != end_col or row != end_row):
-                if board[row][col] is not None:
-                    return False
-                col += col_step
-                row += row_step
-
-            # Check the destination square
-            target_piece = board[end_row][end_col]
-            if target_piece is None or target_piece.color != self.color:
-                return True
-        elif abs(col_diff) == abs(row_diff):
-            # Bishop-like movement (along diagonal)
-            col_step = 1 if col_diff > 0 else -1
-            row_step = 1 if row_diff > 0 else -1
-
-            col, row = start_col + col_step, start_row + row_step
-            while (col != end_col and row != end_row):
-                if board[row][col] is not None:
-                    return False
-                col += col_step
-                row += row_step
+        # Check if move is rook-like (along row or column) or bishop-like (along diagonal)
+        path = ORTHOGONAL_BETWEEN.get((start, end))
+        if path is None:
+            path = DIAGONAL_BETWEEN.get((start, end))
+        if path is None:
+            # If move is not along row, column, or diagonal, invalid
+            return False
 
-            target_piece = board[end_row][end_col]
-            if target_piece is None or target_piece.color != self.color:
-                return True
+        # Check all squares between start and end for obstructions
+        for row, col in path:
+            if board[row][col] is not None:
+                return False
 
-        # If move is not along row, column, or diagonal, invalid
-        return False
+        # Check the destination square
+        end_row, end_col = end
+        target_piece = board[end_row][end_col]
+        return target_piece is None or target_piece.color != self.color
 
 class Rook(Piece):
+    __slots__ = ('has_moved',)
+    PIECE_TYPE = ROOK
+    HAS_MOVED_TRACKED = True
+
     def __init__(self, color, position):
         super().__init__(color, position)
         self.has_moved = False  # For castling purposes
 
-    def __str__(self):
-        return '\u2656' if self.color == 'white' else '\u265C'
-    
-    def valid_moves(self, board, start_pos, end_pos):
+    def valid_moves(self, board, start_pos, end_pos, last_move=None):
         """
         Determines if moving the rook from start_pos to end_pos is valid.
 
@@ -157,58 +196,42 @@ class Rook(Piece):
         - board: The current state of the chessboard.
         - start_pos: Starting position string (e.g., 'a1').
         - end_pos: Ending position string (e.g., 'a4').
+        - last_move: Unused; accepted so every piece shares the same signature.
 
         Returns:
         - True if the move is valid, False otherwise.
         """
-        # Convert positions to indices
-        try:
-            start_row, start_col = position_to_indices(start_pos)
-            end_row, end_col = position_to_indices(end_pos)
-        except ValueError as e:
-            print(e)
+        # Convert positions to indices; a position off the board is never a valid move
+        start = POS_IDX.get(start_pos)
+        end = POS_IDX.get(end_pos)
+        if start is None or end is None:
             return False
-        
+
         # Check if move is along the same row or column
-        if start_row == end_row or start_col == end_col:
-            # Determine the direction of movement
-            col_step = 0
-            if start_col < end_col:
-                col_step = 1
-            elif start_col > end_col:
-                col_step = -1
-            
-            row_step = 0
-            if start_row < end_row:
-                row_step = 1
-            elif start_row > end_row:
-                row_step = -1
-
-            # Check all squares between start and end for obstructions
-            col, row = start_col + col_step, start_row + row_step
-            while (col != end_col or row != end_row):
-                if board[row][col] is not None:
-                    # There's a piece blocking the rook's path
-                    return False
-                col += col_step
-                row += row_step
-
-            # Check the destination square
-            target_piece = board[end_row][end_col]
-            if target_piece is None or target_piece.color != self.color:
-                return True
+        path = ORTHOGONAL_BETWEEN.get((start, end))
+        if path is None:
+            # If move is not along row or column, invalid
+            return False
 
-        # If move is not along row or column, invalid
-        return False
+        # Check all squares between start and end for obstructions
+        for row, col in path:
+            if board[row][col] is not None:
+                # There's a piece blocking the rook's path
+                return False
+
+        # Check the destination square
+        end_row, end_col = end
+        target_piece = board[end_row][end_col]
+        return target_piece is None or target_piece.color != self.color
 
 class Bishop(Piece):
+    __slots__ = ()
+    PIECE_TYPE = BISHOP
+
     def __init__(self, color, position):
         super().__init__(color, position)
     
-    def __str__(self):
-        return '\u2657' if self.color == 'white' else '\u265D'
-    
-    def valid_moves(self, board, start_pos, end_pos):
+    def valid_moves(self, board, start_pos, end_pos, last_move=None):
         """
         Determines if moving the bishop from start_pos to end_pos is valid.
 
@@ -216,53 +239,42 @@ class Bishop(Piece):
         - board: The current state of the chessboard.
         - start_pos: Starting position string (e.g., 'c1').
         - end_pos: Ending position string (e.g., 'h6').
+        - last_move: Unused; accepted so every piece shares the same signature.
 
         Returns:
         - True if the move is valid, False otherwise.
         """
-        # Convert positions to indices
-        try:
-            start_row, start_col = position_to_indices(start_pos)
-            end_row, end_col = position_to_indices(end_pos)
-        except ValueError as e:
-            print(e)
+        # Convert positions to indices; a position off the board is never a valid move
+        start = POS_IDX.get(start_pos)
+        end = POS_IDX.get(end_pos)
+        if start is None or end is None:
             return False
-        
-        # Calculate movement differences
-        col_diff = end_col - start_col
-        row_diff = end_row - start_row
-        
+
         # Check if move is along a diagonal
-        if abs(col_diff) == abs(row_diff):
-            # Determine the direction of movement
-            col_step = 1 if col_diff > 0 else -1
-            row_step = 1 if row_diff > 0 else -1
-
-            # Check all squares between start and end for obstructions
-            col, row = start_col + col_step, start_row + row_step
-            while (col != end_col and row != end_row):
-                if board[row][col] is not None:
-                    # There's a piece blocking the bishop's path
-                    return False
-                col += col_step
-                row += row_step
-
-            # Check the destination square
-            target_piece = board[end_row][end_col]
-            if target_piece is None or target_piece.color != self.color:
-                return True
+        path = DIAGONAL_BETWEEN.get((start, end))
+        if path is None:
+            # If move is not along a diagonal, invalid
+            return False
 
-        # If move is not along a diagonal, invalid
-        return False
+        # Check all squares between start and end for obstructions
+        for row, col in path:
+            if board[row][col] is not None:
+                # There's a piece blocking the bishop's path
+                return False
+
+        # Check the destination square
+        end_row, end_col = end
+        target_piece = board[end_row][end_col]
+        return target_piece is None or target_piece.color != self.color
 
 class Knight(Piece):
+    __slots__ = ()
+    PIECE_TYPE = KNIGHT
+
     def __init__(self, color, position):
         super().__init__(color, position)
     
-    def __str__(self):
-        return '\u2658' if self.color == 'white' else '\u265E'
-    
-    def valid_moves(self, board, start_pos, end_pos):
+    def valid_moves(self, board, start_pos, end_pos, last_move=None):
         """
         Determines if moving the knight from start_pos to end_pos is valid.
 
@@ -270,40 +282,38 @@ class Knight(Piece):
         - board: The current state of the chessboard.
         - start_pos: Starting position string (e.g., 'g1').
         - end_pos: Ending position string (e.g., 'f3').
+        - last_move: Unused; accepted so every piece shares the same signature.
 
         Returns:
         - True if the move is valid, False otherwise.
         """
-        # Convert positions to indices
-        try:
-            start_row, start_col = position_to_indices(start_pos)
-            end_row, end_col = position_to_indices(end_pos)
-        except ValueError as e:
-            print(e)
+        # Convert positions to indices; a position off the board is never a valid move
+        start = POS_IDX.get(start_pos)
+        end = POS_IDX.get(end_pos)
+        if start is None or end is None:
             return False
-        
-        # Calculate movement differences
-        col_diff = abs(end_col - start_col)
-        row_diff = abs(end_row - start_row)
-        
+
         # Check if the move is a valid knight move
-        if (col_diff == 2 and row_diff == 1) or (col_diff == 1 and row_diff == 2):
-            target_piece = board[end_row][end_col]
-            # Check if the destination is empty or contains an opponent's piece
-            if target_piece is None or target_piece.color != self.color:
-                return True
-        # If none of the valid moves apply
-        return False
+        if end not in KNIGHT_MOVES[start]:
+            return False
+
+        # Check if the destination is empty or contains an opponent's piece
+        end_row, end_col = end
+        target_piece = board[end_row][end_col]
+        return target_piece is None or target_piece.color != self.color
 
 class Pawn(Piece):
+    __slots__ = ('has_moved', 'direction')
+    PIECE_TYPE = PAWN
+    HAS_MOVED_TRACKED = True
+
     def __init__(self, color, position):
         super().__init__(color, position)
         self.has_moved = False  # Tracks whether the pawn has moved
+        # White moves up (decreasing row index), black moves down (increasing row index)
+        self.direction = -1 if color == 'white' else 1
         
-    def __str__(self):
-        return '\u2659' if self.color == 'white' else '\u265F'
-    
-    def valid_moves(self, board, start_pos, end_pos, last_move):
+    def valid_moves(self, board, start_pos, end_pos, last_move=None):
         """
         Determines if moving the pawn from start_pos to end_pos is valid.
 
@@ -311,23 +321,23 @@ class Pawn(Piece):
         - board: The current state of the chessboard.
         - start_pos: Starting position string (e.g., 'e2').
         - end_pos: Ending position string (e.g., 'e4').
+        - last_move: The opponent's last move as (start_pos, end_pos), used for en passant.
 
         Returns:
         - True if the move is valid, False otherwise.
         """
-        # Convert positions to indices
-        try:
-            start_row, start_col = position_to_indices(start_pos)
-            end_row, end_col = position_to_indices(end_pos)
-        except ValueError as e:
-            print(e)
+        # Convert positions to indices; a position off the board is never a valid move
+        start = POS_IDX.get(start_pos)
+        end = POS_IDX.get(end_pos)
+        if start is None or end is None:
             return False
-        
-        # Calculate the direction of movement
-        if self.color == 'white':
-            direction = -1  # White moves up (decreasing row index)
-        else:
-            direction = 1   # Black moves down (increasing row index)
+        # The direction of movement is fixed by the pawn's color
+        direction = self.direction
+        if end not in PAWN_MOVES[direction][start]:
+            # Not a push or diagonal step of this pawn
+            return False
+        start_row, start_col = start
+        end_row, end_col = end
 
         # Calculate movement differences
         col_diff = end_col - start_col
@@ -358,26 +368,29 @@ class Pawn(Piece):
                 # Check if the last move was an opponent's pawn moving two squares forward
                 if last_move:
                     last_start_pos, last_end_pos = last_move
-                    last_start_row, last_start_col = position_to_indices(last_start_pos)
-                    last_end_row, last_end_col = position_to_indices(last_end_pos)
-                    last_moved_piece = board[last_end_row][last_end_col]
-                    if isinstance(last_moved_piece, Pawn) and last_moved_piece.color != self.color:
-                        # Check if the pawn moved two squares forward
-                        if abs(last_end_row - last_start_row) == 2:
-                            # Check if the pawn is adjacent to our pawn
-                            if last_end_row == start_row and last_end_col == end_col:
-                                # En passant capture is possible
-                                return True
+                    last_end_row, last_end_col = POS_IDX[last_end_pos]
+                    # Check if the last moved piece landed next to our pawn, on the file we move to;
+                    # this rules out almost every move before the board is even read
+                    if last_end_row == start_row and last_end_col == end_col:
+                        last_start_row = POS_IDX[last_start_pos][0]
+                        last_moved_piece = board[last_end_row][last_end_col]
+                        # Check if it was an opponent's pawn moving two squares forward
+                        if (abs(last_end_row - last_start_row) == 2 and last_moved_piece is not None
+                                and last_moved_piece.PIECE_TYPE == PAWN
+                                and last_moved_piece.color != self.color):
+                            # En passant capture is possible
+                            return True
 
         # If none of the valid moves apply
         return False
     
-    def promote_pawn(self, color, end_pos):
+    def promote_pawn(self, color, end_pos, choice=None):
         """
         Promotes a pawn to a new piece chosen by the player.
 
         Parameters:
         - color: The color of the pawn ('white' or 'black').
+        - choice: 'Q', 'R', 'B' or 'N' to promote without asking; the player is prompted if None.
 
         Returns:
         - The new piece object to replace the pawn.
@@ -386,15 +399,13 @@ class Pawn(Piece):
         # For this example, we'll default to a Queen or allow the player to choose.
 
         while True:
-            choice = input(f"Promote pawn to (Q)ueen, (R)ook, (B)ishop, or k(N)ight? ").strip().upper()
-            if choice == 'Q':
-                return Queen(color, end_pos)
-            elif choice == 'R':
-                return Rook(color, end_pos)
-            elif choice == 'B':
-                return Bishop(color, end_pos)
-            elif choice == 'N':
-                return Knight(color, end_pos)
-            else:
-                print("Invalid choice. Please enter Q, R, B, or N.")
-
+            if choice is None:
+                choice = input(f"Promote pawn to (Q)ueen, (R)ook, (B)ishop, or k(N)ight? ").strip().upper()
+            piece_class = PROMOTION_PIECES.get(choice)
+            if piece_class is not None:
+                return piece_class(color, end_pos)
+            print("Invalid choice. Please enter Q, R, B, or N.")
+            choice = None
+
+# Piece class for each promotion letter
+PROMOTION_PIECES = {'Q': Queen, 'R': Rook, 'B': Bishop, 'N': Knight}
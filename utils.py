@@ -1,3 +1,11 @@
+# Indices (row, col) of every position on the board, e.g. POS_IDX['a1'] == (0, 0)
+# and POS_IDX['h8'] == (7, 7). Use POS_IDX.get to get None instead of an error
+# for positions that are not on the board.
+POS_IDX = {file + rank: (int(rank) - 1, ord(file) - ord('a'))
+           for file in 'abcdefgh' for rank in '12345678'}
+# The reverse table: the position of the square (row, col) is IDX_TO_POS[row * 8 + col]
+IDX_TO_POS = [file + rank for rank in '12345678' for file in 'abcdefgh']
+
 # Define the position_to_indices function
 def position_to_indices(position):
     """
@@ -6,19 +14,22 @@ def position_to_indices(position):
 
     :param position: The chessboard position as a string (e.g., 'a1').
     :return: A tuple of (row, col) indices.
+    :raises ValueError: If the position is not on the board.
     """
-    col = ord(position[0].lower()) - ord('a')  # Convert column 'a'-'h' to 0-7
-    row = int(position[1]) - 1  # Convert row '1'-'8' to 0-7
-    return row, col
+    try:
+        return POS_IDX[position]
+    except KeyError:
+        raise ValueError(f"Invalid position: {position}") from None
 
-def indices_to_position(col, row):
+def indices_to_position(row, col):
     """
-    :param indices: A tuple of (row, col) indices.
+    Convert indices (row, col) to a chessboard position, the reverse of position_to_indices.
+
+    :param row: The row index (0-7), i.e. the rank minus one.
+    :param col: The column index (0-7), where 0 is file 'a'.
     :return: The chessboard position as a string (e.g., 'a1').
     """
-    col_letter = chr(col + ord('a'))  # Convert column index (0-7) to letter ('a'-'h')
-    row_number = str(row + 1)        # Convert row index (0-7) to number ('1'-'8')
-    return col_letter + row_number
+    return IDX_TO_POS[row * 8 + col]
 
 
 def get_piece_info(board, position_str):
@@ -33,12 +44,11 @@ def get_piece_info(board, position_str):
     - (piece_type, color): Tuple containing the subclass name and color.
       Returns (None, None) if there's no piece at the position.
     """
-    # Convert position string to board indices
-    try:
-        row, col = position_to_indices(position_str)
-    except ValueError as e:
-        print(e)
+    # Convert position string to board indices; there is no piece off the board
+    indices = POS_IDX.get(position_str)
+    if indices is None:
         return None, None
+    row, col = indices
 
     # Access the piece at the given position
     piece = board[row][col]